@@ -4,13 +4,19 @@ import rich
 import rich.live
 import rich.progress
 import rich.layout
+import rich.markup
 from rich import print
 import keyboard
 from enum import Enum, auto
 import collections 
+import collections.abc
 import typing
 import json
-import pyvis
+import threading
+import bisect
+import mmap
+import sys
+import array as array_module
 
 # ontology data for agent modeling
 # this file contains definitions of concepts, adverts, actions, and verbs
@@ -72,8 +78,9 @@ layout.split_column(
     rich.layout.Layout("", name="time")
 )
 
-live = rich.live.Live(layout, refresh_per_second=30)
-# live.start()
+ui_refresh_rate = 30
+
+live = rich.live.Live(layout, refresh_per_second=ui_refresh_rate)
 
 total_time = 0
 
@@ -129,6 +136,118 @@ class Need:
 def human_costs(bladder = 0, food = 0, sleep = 0, mood = 0):
     return array([bladder, food, sleep, mood])
 
+# how much each need changes per second for an agent that isn't doing anything about it
+need_decay = np.zeros(needs.count.value)
+need_decay[needs.sleep.value] = sleep_loss
+need_decay[needs.food.value]  = food_loss
+need_decay[needs.mood.value]  = mood_loss
+
+# the slots of a needs array that are actually used, since needs start at 1
+need_indices = array([k.value for k in needs if k != needs.count])
+
+# levels that raise an event when a need passes over them, in either direction
+need_thresholds = array([0.1, 0.25, 0.5])
+
+# need crossings found by NeedState.step(). each is an array with an entry per crossing: the 
+# agent's row, the need that crossed, and the threshold bands it moved between, where band b 
+# means the need is at or above b of the need_thresholds
+NeedEvents = collections.namedtuple("NeedEvents", ["agents", "needs", "before", "after"])
+
+# the needs of every agent in a world, stored as rows of one array so that decay and the costs
+# of actions are applied to all of them in a single clamped update per step. each agent's 
+# 'needs' is a view of its row, so reading and writing it directly still works
+class NeedState:
+    def __init__(self, thresholds = need_thresholds):
+        self.agents     = []
+        self.thresholds = np.sort(thresholds)
+        self.values     = np.zeros((0, needs.count.value))
+        self.decay      = np.zeros((0, needs.count.value))
+        self.pending    = np.zeros((0, needs.count.value)) # costs to apply on the next step
+        self.bands      = np.zeros((0, needs.count.value), dtype=np.int8)
+
+    def grow(self, capacity):
+        def resize(a):
+            out = np.zeros((capacity, a.shape[1]), dtype=a.dtype)
+            out[:len(a)] = a
+            return out
+        self.values  = resize(self.values)
+        self.decay   = resize(self.decay)
+        self.pending = resize(self.pending)
+        self.bands   = resize(self.bands)
+        for i,agent in enumerate(self.agents):
+            agent.needs = self.values[i]
+
+    # gives the agent a row, starting from whatever its needs currently are. an agent that is in 
+    # another NeedState is moved out of it
+    def add(self, agent, decay = None):
+        if agent.need_state is self: return
+        if agent.need_state is not None: agent.need_state.remove(agent)
+        i = len(self.agents)
+        if i == len(self.values): self.grow(max(16, 2*i))
+        self.values[i] = np.clip(agent.needs, 0, 1)
+        self.decay[i]  = need_decay if decay is None else decay
+        self.bands[i]  = self.band(self.values[i])
+        self.agents.append(agent)
+        agent.need_index = i
+        agent.need_state = self
+        agent.needs = self.values[i]
+
+    # takes the agent's row away, moving the last row into its place. the agent keeps a copy of 
+    # its needs
+    def remove(self, agent):
+        i = agent.need_index
+        last = len(self.agents) - 1
+        agent.needs = self.values[i].copy()
+        agent.need_index = -1
+        agent.need_state = None
+        if i != last:
+            moved = self.agents[last]
+            self.values[i]  = self.values[last]
+            self.decay[i]   = self.decay[last]
+            self.pending[i] = self.pending[last]
+            self.bands[i]   = self.bands[last]
+            self.agents[i]  = moved
+            moved.need_index = i
+            moved.needs = self.values[i]
+        self.values[last]  = 0
+        self.decay[last]   = 0
+        self.pending[last] = 0
+        self.bands[last]   = 0
+        self.agents.pop()
+
+    # how many of the thresholds each value is at or above
+    def band(self, values):
+        out = np.zeros(values.shape, dtype=np.int8)
+        for threshold in self.thresholds:
+            out += values >= threshold
+        return out
+
+    def set_decay(self, agent, decay):
+        self.decay[agent.need_index] = decay
+
+    # queues the costs of an action to be applied to the agent on the next step
+    def cost(self, agent, costs):
+        self.pending[agent.need_index] += costs
+
+    # advances every agent's needs by dt seconds, which can be more than one tick when skipping 
+    # ahead, applying any queued costs. returns the threshold crossings this caused
+    def step(self, dt = 1):
+        n = len(self.agents)
+        values = self.values[:n]
+        pending = self.pending[:n]
+        pending += self.decay[:n] * dt
+        values += pending
+        np.clip(values, 0, 1, out=values)
+        pending.fill(0)
+
+        bands = self.band(values)
+        changed = bands != self.bands[:n]
+        if changed.any(): rows,cols = np.nonzero(changed)
+        else: rows,cols = np.zeros(0, dtype=np.intp), np.zeros(0, dtype=np.intp)
+        events = NeedEvents(rows, cols, self.bands[:n][rows,cols], bands[rows,cols])
+        self.bands[:n] = bands
+        return events
+
 # grammar helper
 class Verb:
     def __init__(self, infinitive, present, past):
@@ -137,6 +256,35 @@ class Verb:
         self.past_participle = past
 
 
+# everything that is loaded from an ontology and simulated together. several worlds can be 
+# loaded from different ontologies without them seeing each other.
+# if an OntologyIndex is given, concepts and templates are read from it on first access instead
+# of being loaded up front, and at most cache_size of each are kept in memory between lookups.
+# looking up a concept also loads everything it references (its whole ancestry), so a single 
+# lookup can briefly hold more than cache_size entries. such a world can't be given to load_ontology
+class World:
+    def __init__(self, index = None, cache_size = 4096):
+        self.objects          = []
+        self.agents           = []
+        self.errors           = []
+        self.need_state       = NeedState()
+        if index is None:
+            self.concepts         = {}
+            self.req_templates    = {}
+            self.action_templates = {}
+            self.object_templates = {}
+            self.agent_templates  = {}
+        else:
+            loader = LazyLoader(self)
+            self.concepts         = LazyTable(index, 'concepts', "concept",         loader, Concept, fill_concept,  cache_size)
+            self.req_templates    = LazyTable(index, 'reqs',     "req template",    loader, dict,    fill_reqs,     cache_size)
+            self.action_templates = LazyTable(index, 'actions',  "action template", loader, Action,  fill_action,   cache_size)
+            self.object_templates = LazyTable(index, 'objects',  "object template", loader, Object,  fill_template, cache_size)
+            self.agent_templates  = LazyTable(index, 'agents',   "agent template",  loader, Agent,   fill_template, cache_size)
+
+default_world = World()
+
+
 # anything that exists, whether it be physical, abstract, tangible, intangible... so on.
 # all things have a name and a set of predicates describing qualities about that thing
 class Entity:
@@ -167,12 +315,13 @@ class Concept(Entity):
     def __str__(self): return f"Concept[{self.name}]"
     def __repr__(self): return self.__str__()
 
-concepts = {} # loaded in by load_ontology()
+concepts = default_world.concepts # loaded in by load_ontology()
 
 
 # an event that is caused by an agent, given to them when chosen through an advert
 class Action(Concept):
     def __init__(self):
+        super().__init__()
         self.time = 0
         self.costs = array([0.0] * needs.count.value)
         self.reqs = {}
@@ -184,8 +333,8 @@ class Action(Concept):
                     return 0
                 continue
 
-req_templates = {}
-action_templates = {}
+req_templates = default_world.req_templates
+action_templates = default_world.action_templates
 
 # represents a advertisement that an object projects to other objects. 
 # consists of a series of actions for the agent to undertake
@@ -210,7 +359,7 @@ class Advert:
 
 adverts = {}
 
-objects = []
+objects = default_world.objects
 
 # Entity/Object
 # something tangible that may be acted upon. has a position in reality, an age, mass, and a 
@@ -253,7 +402,7 @@ class Object(Entity):
     def __str__(self): return f"Object[{self.name}]"
     def __repr__(self): return self.__str__()
 
-object_templates = {}
+object_templates = default_world.object_templates
 
 # Entity/Object/Agent
 # an animate object that can make decisions to take actions on other objects based on 
@@ -261,8 +410,11 @@ object_templates = {}
 class Agent(Object):
     def __init__(self):
         super().__init__()
-        self.action_queue : list[tuple[Action,int]] = []# stores a queue of actions as well as the time remaining for that action
+        self.action_queue : list[list] = [] # stores a queue of actions as well as the time remaining for that action
         self.needs   = array([1.0] * needs.count.value)
+        self.world      = None # the world it was added to with add_agent
+        self.need_state = None # its world's NeedState, once added to one
+        self.need_index = -1   # and its row in it
         self.memories = []
 
     @classmethod
@@ -272,24 +424,33 @@ class Agent(Object):
         return agent
 
     def array(self):
-        return np.array([self.needs["bladder"], self.needs["food"], self.needs["sleep"], self.needs["mood"]])
+        return [Need(needs(i).name, self.needs[i]) for i in need_indices]
 
     def val_array(self):
-        return np.array([self.needs["bladder"].value, self.needs["food"].value, self.needs["sleep"].value, self.needs["mood"].value])
+        return self.needs[need_indices]
 
 
 
     def __str__(self): return f"Agent[{self.name}]"
     def __repr__(self): return self.__str__()
 
-agent_templates = {}
+agent_templates = default_world.agent_templates
 
 
 # ----------------------------------------------------------------------------------------------------------------------------------------------------
 #      @functions
 # ----------------------------------------------------------------------------------------------------------------------------------------------------
 
-agents = []
+agents = default_world.agents
+need_state = default_world.need_state
+
+def add_agent(agent, world = None, decay = None):
+    if world is None: world = default_world
+    if agent.world is world: return
+    if agent.world is not None: agent.world.agents.remove(agent)
+    world.agents.append(agent)
+    world.need_state.add(agent, decay)
+    agent.world = world
 
 def has_quality(object, quality):
     if 'has quality' in object.predicates and quality in object.predicates['has quality']:
@@ -307,29 +468,32 @@ def has_quality(object, quality):
     return 0
 
 # loads data into a given obj from a template
-def load_object_from_template(name):
+def load_object_from_template(name, world = None):
     def error(str):
         perrort("load_object_from_template", f"while loading from template '{name}': {str}")
 
-    if name not in object_templates:
+    if world is None: world = default_world
+    if name not in world.object_templates:
         error(f"{name} has no object template")
         return
 
-    o = object_templates[name]
+    o = world.object_templates[name]
     obj = Object()
+    obj.name = name
     obj.adverts = o.adverts
     obj.predicates = o.predicates
     return obj
 
-def load_agent_from_template(name):
+def load_agent_from_template(name, world = None):
     def error(str):
         perrort("load_agent_from_template", f"while loading from template '{name}': {str}")
 
-    if name not in agent_templates:
+    if world is None: world = default_world
+    if name not in world.agent_templates:
         error(f"{name} has no agent template")
         return
     
-    o = agent_templates[name]
+    o = world.agent_templates[name]
     obj = Agent()
     obj.adverts = o.adverts
     obj.predicates = o.predicates
@@ -360,67 +524,8 @@ def print_predicates(subject:str,preds:dict, level = 2):
             else:
                 print(f"{subject} is {v}")
 
-paused = 1
-
-def load_requirement_templates(ontology):
-    req_templates = ontology['templates']['reqs']
-
-
-def load_concepts(ontology:dict):
-    # we have to load all concepts in first, because they reference each other
-    for concept in ontology["concepts"]:
-        if concept in concepts: 
-            perrort("concept loading", f"Duplicate concept {concept}.")
-            return
-        concepts[concept] = Concept()
-        
-    for con,attributes in ontology["concepts"].items():
-        concept = concepts[con]
-        concept.name = con
-        for attribute,value in attributes.items():
-
-            if attribute in concept.predicates:
-                perrort("concept loading", f"Duplicate attribute '{attribute}'. If you want to define multiple values for an attribute, use an array.")
-                continue
-
-            if attribute == 'desc':
-                if type(value) != str:
-                    perrort("concept loading", f"Invalid value for 'desc' on '{concept}', must be a string.")
-                concept.desc = value
-
-            if attribute == 'subclass of' or attribute == 'instance of':
-                if type(value) == list:
-                    concept.predicates[attribute] = []
-                    for element in value:
-                        if element not in concepts:
-                            perrort("concept loading", f"The concept '{element}' was not defined, but it is referenced by '{concept}'.")
-                            continue
-                        concept.predicates[attribute].append(concepts[element])
-                elif type(value) == str:
-                    if value not in concepts:
-                        perrort("concept loading", f"The concept '{value}' was not defined, but it is referenced by '{concept}'.")
-                    else: concept.predicates[attribute] = concepts[value]
-                else: perrort("concept loading", f"Invald value for attribute '{attribute}' on '{concept}', must be either a string or an array of strings.")
-
-            if attribute == 'part of':
-                if type(value) == list:
-                    concept.predicates['part of'] = []
-                    for element in value:
-                        if element not in concepts:
-                            perrort("concept loading", f"The concept '{element}' was not defined, but it is referenced by '{concept}'.")
-                            continue
-                        concept.predicates['part of'].append(concepts[element])
-                elif type(value) == str:
-                    if value not in concepts:
-                        perrort("concept loading", f"The concept '{value}' was not defined, but it is referenced by '{concept}'.")
-                    else: concept.predicates['part of'] = value
-                else: perrort("concept loading", f"Invald value for attribute 'part of' on '{concept}', must be either a string or an array of strings.")
-
-            if attribute == 'has quality':
-                if type(value) == list:
-                    concept.predicates['has quality'] = []
-                    for element in value:
-                        concept.predicates['has quality'].append(element)
+# cleared while the simulation is paused, toggled with space
+running = threading.Event()
 
 # walks up the tree to see if this concept can be considered an agent, eg. is it or any of its inherited 
 # concepts a subclass of animal. this method really sucks, probably just store a variable 
@@ -439,180 +544,598 @@ def concept_is_agent(obj):
     return 0
 
 # returns whether or not the given string represents any concept
-def is_concept(name):
-    if name in concepts:
+def is_concept(name, world = None):
+    if world is None: world = default_world
+    if name in world.concepts:
         return 1
     else:
         return 0
 
-# TODO implement actions being concepts somehow
-def load_action_templates(ontology):
-    actions = ontology['templates']['actions']
+# ----------------------------------------------------------------------------------------------------------------------------------------------------
+#      @loading
+# ----------------------------------------------------------------------------------------------------------------------------------------------------
 
-    working_action = ""
+ontology_path = "misc/agent_modeling/ontology.json"
+
+time_units = {
+    'seconds': one_second,
+    'minutes': one_minute,
+    'hours':   one_hour,
+    'days':    one_day,
+    'months':  one_month,
+    'years':   one_year,
+}
+
+# state for a single load of an ontology into a world. errors are collected here rather than 
+# printed as they are found, so that a large ontology can be checked in one go
+class OntologyLoader:
+    def __init__(self, world):
+        self.world = world
+        self.errors = []
+        self.context = ""
+        # concepts that have been referenced before being defined, mapped to the 
+        # (concept, attribute) pairs that reference them
+        self.forward = {}
+
+    def error(self, str):
+        self.errors.append(f"while loading {self.context}: {str}")
+
+    # returns the concept with the given name, making a placeholder for it if it hasn't been
+    # defined yet. placeholders that are never defined are removed by finish_concepts()
+    def reference(self, name, concept, attribute):
+        if type(name) != str:
+            self.error(f"invalid value for '{attribute}', must be a string or an array of strings.")
+            return None
+        if name in self.world.concepts and name not in self.forward:
+            return self.world.concepts[name]
+        if name not in self.forward:
+            placeholder = Concept()
+            placeholder.name = name
+            self.world.concepts[name] = placeholder
+            self.forward[name] = []
+        self.forward[name].append((concept, attribute))
+        return self.world.concepts[name]
+
+    def define(self, name):
+        if name in self.forward:
+            del self.forward[name]
+            return self.world.concepts[name]
+        if name in self.world.concepts:
+            self.error(f"duplicate concept '{name}'.")
+            return None
+        concept = Concept()
+        concept.name = name
+        self.world.concepts[name] = concept
+        return concept
+
+    # drops every reference to a concept that was never defined
+    def finish_concepts(self):
+        for name,refs in self.forward.items():
+            missing = self.world.concepts.pop(name)
+            for concept,attribute in refs:
+                self.errors.append(f"while loading concept '{concept.name}': the concept '{name}' was not defined, but it is referenced by '{concept.name}'.")
+                value = concept.predicates.get(attribute)
+                if type(value) == list:
+                    concept.predicates[attribute] = [v for v in value if v is not missing]
+                elif value is missing:
+                    del concept.predicates[attribute]
+        self.forward = {}
 
-    def error(str):
-        perrort("action template loader", f"while loading '{working_action}' template: {str}")
-
-    for a, data in actions.items():
-        working_action = a
-        action = Action()
-        action.name = a
-
-        def load_time(times):
-            t = 0
-            for time,value in times.items():
-                if   time == 'seconds': t += value * one_second
-                elif time == 'minutes': t += value * one_minute
-                elif time == 'hours':   t += value * one_hour
-                elif time == 'days':    t += value * one_day
-                elif time == 'months':  t += value * one_month
-                elif time == 'years':   t += value * one_year
-            return t
-
-        for attribute, value in data.items():
-            if attribute == 'time':
-                action.time = load_time(value)
-            elif attribute == 'reqs':
-                if type(value) == str:
-                    # the action must want to load the reqs defined for a certain concept
-                    if value not in req_templates: error(f"there is no req template specified for the concept '{value}'"); continue
-                    action.reqs = req_templates[value]
-                elif type(value) == dict:
-                    action.reqs = value # no saftey checking is done here, if something is wrong it wont be exposed until later
-                else: error(f"invalid value for 'reqs'"); continue
-
-def load_object_templates(ontology):
-    templates = ontology['templates']['objects']
-
-    working_object = ""
+def is_number(value):
+    return type(value) == int or type(value) == float
 
-    def error(str):
-        perrort("object template loader", f"while loading '{working_object}' template: {str}")
+def load_concept_desc(loader, concept, attribute, value):
+    if type(value) != str:
+        loader.error("invalid value for 'desc', must be a string.")
+        return
+    concept.desc = value
 
-    for o, data in templates.items():
-        working_object = o
-        if not is_concept(o):
-            error(f"The name '{o}' does not belong to any loaded concept.")
-            continue
-        object_templates[o] = Object()
-        object : Object = object_templates[o]
-        object.age = 0
-        object.mass = 0
-        object.pos = (0,0)
-        object.name = o
-        object.predicates['instance of'] = concepts[o]
-
-        def load_time(times):
-            t = 0
-            for time,value in times.items():
-                if   time == 'seconds': t += value * one_second
-                elif time == 'minutes': t += value * one_minute
-                elif time == 'hours':   t += value * one_hour
-                elif time == 'days':    t += value * one_day
-                elif time == 'months':  t += value * one_month
-                elif time == 'years':   t += value * one_year
-            return t
-
-        def load_action(action):
-            out = Action()
-            for attr, data in action.items():
-                if attr == 'time':
-                    out.time = load_time(data)
-                elif attr == 'costs':
-                    for cost,value in data.items():
-                        if   cost == 'food':    out.costs[needs.food.value] = value
-                        elif cost == 'mood':    out.costs[needs.mood.value] = value
-                        elif cost == 'sleep':   out.costs[needs.sleep.value] = value
-                        elif cost == 'bladder': out.costs[needs.bladder.value] = value
-                elif attr == 'reqs':
-                    out.reqs = data
-            return out
+def load_concept_references(loader, concept, attribute, value):
+    if type(value) == list:
+        refs = [loader.reference(element, concept, attribute) for element in value]
+        concept.predicates[attribute] = [r for r in refs if r is not None]
+    else:
+        ref = loader.reference(value, concept, attribute)
+        if ref is not None: concept.predicates[attribute] = ref
 
-        def load_actions(actions):
-            return # TODO implement multiple actions
-            out = []
-            for act, data in actions.items():
-                action = Action()
-                action.name = act
-                if type(data) == str: # here we assume that the user wants the action to just be one defined in action templates
-                    if data not in action_templates:
-                        error("Attempted to load action '{data}' as a template, but no template is defined for this name.")
-                        continue
-                elif type(data) == dict:
-                    pass  
-                else: error("invalid data type for action"); continue
-
-        def load_adverts(adverts):
-            out = []
-            for ad, data in adverts.items():
-                advert = Advert()
-                advert.name = ad
-                for attribute, value in data.items():
-                    if attribute == 'action':
-                        advert.actions.append(load_action(value))
-                    elif attribute == 'actions':
-                        advert.actions = load_actions(value)
-                out.append(advert)
-            return out
+def load_concept_qualities(loader, concept, attribute, value):
+    if type(value) == str: value = [value]
+    if type(value) != list:
+        loader.error("invalid value for 'has quality', must be a string or an array of strings.")
+        return
+    concept.predicates['has quality'] = list(value)
+
+# attributes without a handler (eg. 'plural') are not used yet and are skipped
+concept_handlers = {
+    'desc':        load_concept_desc,
+    'subclass of': load_concept_references,
+    'instance of': load_concept_references,
+    'part of':     load_concept_references,
+    'has quality': load_concept_qualities,
+}
+
+def fill_concept(loader, concept, name, attributes):
+    concept.name = name
+    if type(attributes) != dict:
+        loader.error("invalid value for a concept, must be an object of attributes.")
+        return
+    for attribute,value in attributes.items():
+        handler = concept_handlers.get(attribute)
+        if handler is not None: handler(loader, concept, attribute, value)
+
+# returns ontology[key] if it's an object, otherwise reports it and returns an empty one
+def load_section(loader, ontology, key):
+    value = ontology.get(key, {})
+    if type(value) != dict:
+        loader.context = "ontology"
+        loader.error(f"invalid value for '{key}', must be an object.")
+        return {}
+    return value
+
+def load_concepts(loader, ontology:dict):
+    for name,attributes in load_section(loader, ontology, "concepts").items():
+        loader.context = f"concept '{name}'"
+        concept = loader.define(name)
+        if concept is None: continue
+        fill_concept(loader, concept, name, attributes)
+    loader.finish_concepts()
+
+def load_time(loader, times):
+    if type(times) != dict:
+        loader.error("invalid value for 'time', must be an object of time units.")
+        return 0
+    t = 0
+    for unit,value in times.items():
+        if unit not in time_units:
+            loader.error(f"unknown time unit '{unit}'.")
+            continue
+        if not is_number(value):
+            loader.error(f"invalid value for '{unit}', must be a number.")
+            continue
+        t += value * time_units[unit]
+    return t
 
-        for attribute,value in data.items():
-            if attribute == 'adverts':
-                object.adverts = load_adverts(value)
+def load_action_time(loader, action, value):
+    action.time = load_time(loader, value)
 
-def load_agent_templates(ontology):
-    templates = ontology['templates']['agents']
+def load_action_costs(loader, action, value):
+    if type(value) != dict:
+        loader.error("invalid value for 'costs', must be an object of needs.")
+        return
+    for cost,v in value.items():
+        if cost not in needs.__members__ or cost == 'count':
+            loader.error(f"unknown need '{cost}' in 'costs'.")
+            continue
+        if not is_number(v):
+            loader.error(f"invalid value for cost '{cost}', must be a number.")
+            continue
+        action.costs[needs[cost].value] = v
 
-    working_agent = ""
+def load_action_reqs(loader, action, value):
+    if type(value) == str:
+        # the action wants to use the reqs defined for a certain concept
+        if value not in loader.world.req_templates:
+            loader.error(f"there is no req template specified for the concept '{value}'.")
+            return
+        action.reqs = loader.world.req_templates[value]
+    elif type(value) == dict:
+        action.reqs = value # no saftey checking is done here, if something is wrong it wont be exposed until later
+    else: loader.error("invalid value for 'reqs'.")
+
+action_handlers = {
+    'time':  load_action_time,
+    'costs': load_action_costs,
+    'reqs':  load_action_reqs,
+}
+
+def fill_action(loader, action, name, data):
+    action.name = name
+    if type(data) != dict:
+        loader.error(f"invalid value for action '{name}', must be an object.")
+        return
+    for attribute,value in data.items():
+        handler = action_handlers.get(attribute)
+        if handler is None: loader.error(f"unknown attribute '{attribute}' on action '{name}'.")
+        else: handler(loader, action, value)
+
+def load_action(loader, name, data):
+    action = Action()
+    fill_action(loader, action, name, data)
+    return action
+
+def load_advert_action(loader, advert, value):
+    advert.actions.append(load_action(loader, advert.name, value))
+
+def load_advert_actions(loader, advert, value):
+    if type(value) != dict:
+        loader.error("invalid value for 'actions', must be an object of actions.")
+        return
+    for name,data in value.items():
+        if type(data) == str: # here we assume that the user wants the action to just be one defined in action templates
+            if data not in loader.world.action_templates:
+                loader.error(f"attempted to load action '{data}' as a template, but no template is defined for this name.")
+                continue
+            advert.actions.append(loader.world.action_templates[data])
+        elif type(data) == dict:
+            advert.actions.append(load_action(loader, name, data))
+        else: loader.error(f"invalid value for action '{name}'.")
+
+advert_handlers = {
+    'action':  load_advert_action,
+    'actions': load_advert_actions,
+}
+
+def load_adverts(loader, adverts):
+    out = []
+    if type(adverts) != dict:
+        loader.error("invalid value for 'adverts', must be an object of adverts.")
+        return out
+    for name,data in adverts.items():
+        if type(data) != dict:
+            loader.error(f"invalid value for advert '{name}', must be an object.")
+            continue
+        advert = Advert()
+        advert.name = name
+        for attribute,value in data.items():
+            handler = advert_handlers.get(attribute)
+            if handler is None: loader.error(f"unknown attribute '{attribute}' on advert '{name}'.")
+            else: handler(loader, advert, value)
+        out.append(advert)
+    return out
+
+# the objects share their template's predicates and adverts, so the template doesn't need to 
+# have been filled yet
+def load_has(loader, data):
+    if data is None: return None
+    if type(data) != dict:
+        loader.error("invalid value for 'has', must be null or an object.")
+        return None
+    out = {}
+    for name,value in data.items():
+        if type(value) != str or not value.startswith("object(") or not value.endswith(")"):
+            loader.error(f"invalid value for '{name}', must be of the form 'object(<concept>)'.")
+            continue
+        n = value[7:-1]
+        if n not in loader.world.concepts:
+            loader.error(f"'{n}' is not a concept.")
+            continue
+        if n not in loader.world.object_templates:
+            loader.error(f"there is no object template for '{n}'.")
+            continue
+        out[name] = load_object_from_template(n, loader.world)
+    return out
 
-    def error(str):
-        perrort("object template loader", f"while loading '{working_agent}' template: {str}")
+predicate_handlers = {
+    'has': load_has,
+}
 
-    for a,data in templates.items():
-        working_agent = a
-        if not is_concept(a):
-            error(f"The name '{a}' does not belong to any loaded concept.")
+def load_template_predicates(loader, template, value):
+    if type(value) != dict:
+        loader.error("invalid value for 'predicates', must be an object.")
+        return
+    for predicate,data in value.items():
+        handler = predicate_handlers.get(predicate)
+        if handler is None: loader.error(f"unknown predicate '{predicate}'.")
+        else: template.predicates[predicate] = handler(loader, data)
+
+# filled in place, since objects made from a template share its list and may have been made 
+# before the template was filled
+def load_template_adverts(loader, template, value):
+    template.adverts[:] = load_adverts(loader, value)
+
+template_handlers = {
+    'predicates': load_template_predicates,
+    'adverts':    load_template_adverts,
+}
+
+def fill_template(loader, template, name, data):
+    template.name = name
+    if name not in loader.world.concepts:
+        loader.error(f"the name '{name}' does not belong to any loaded concept.")
+        return
+    template.predicates['instance of'] = loader.world.concepts[name]
+    if type(data) != dict:
+        loader.error("invalid value for a template, must be an object of attributes.")
+        return
+    for attribute,value in data.items():
+        handler = template_handlers.get(attribute)
+        if handler is None: loader.error(f"unknown attribute '{attribute}'.")
+        else: handler(loader, template, value)
+
+# every template is made before any are filled, so that templates can refer to ones defined after them
+def load_templates(loader, kind, templates, table, cls):
+    valid = []
+    for name,data in templates.items():
+        loader.context = f"{kind} template '{name}'"
+        if name not in loader.world.concepts:
+            loader.error(f"the name '{name}' does not belong to any loaded concept.")
             continue
-        agent_templates[a] = Agent()
-        agent = agent_templates[a]
-
-        def load_predicates(predicates):
-            out = {}
-            for predicate,data in predicates.items():
-                if predicate == 'has':
-                    if type(data) == None:
-                        out['has'] = None
-                    elif type(data) == dict:
-                        out['has'] = {}
-                        for name,value in data.items():
-                            out['has'][name] = {}
-                            if type(value) == str:
-                                if value.startswith("object"):
-                                    n = value[7:-1]
-                                    if not is_concept(n):
-                                        error(f"'{n}' is not a concept.")
-                                        continue
-                                    if n not in object_templates:
-                                        error(f"there is no object template for '{n}'.")
-                                        continue
-                                    out['has'][name] = load_object_from_template(n)
-            return out
+        table[name] = cls()
+        valid.append((name, data))
+    for name,data in valid:
+        loader.context = f"{kind} template '{name}'"
+        fill_template(loader, table[name], name, data)
+
+def fill_reqs(loader, reqs, name, data):
+    if type(data) != dict:
+        loader.error("invalid value for a req template, must be an object.")
+        return
+    reqs.update(data)
+
+def load_req_templates(loader, templates):
+    for name,data in templates.items():
+        loader.context = f"req template '{name}'"
+        reqs = {}
+        fill_reqs(loader, reqs, name, data)
+        loader.world.req_templates[name] = reqs
+
+def load_action_templates(loader, templates):
+    for name,data in templates.items():
+        loader.context = f"action template '{name}'"
+        loader.world.action_templates[name] = load_action(loader, name, data)
+
+# loads an ontology file into the given world, or the default one. returns a list of every error
+# found, which are also kept in world.errors
+def load_ontology(path = ontology_path, world = None):
+    if world is None: world = default_world
+    if isinstance(world.concepts, LazyTable):
+        return [f"while loading '{path}': the world reads from an ontology index and can't have another ontology loaded into it."]
+    f = open(path, encoding="utf8")
+    ontology = json.load(f)
+    f.close()
 
-        for attribute,value in data.items():
-            if attribute == 'predicates':
-                agent.predicates = load_predicates(value)
+    loader = OntologyLoader(world)
+    if type(ontology) != dict:
+        loader.context = "ontology"
+        loader.error("the ontology must be an object.")
+        ontology = {}
+    templates = load_section(loader, ontology, 'templates')
+    load_concepts(loader, ontology)
+    load_req_templates(loader, load_section(loader, templates, 'reqs'))
+    load_action_templates(loader, load_section(loader, templates, 'actions'))
+    load_templates(loader, "object", load_section(loader, templates, 'objects'), world.object_templates, Object)
+    load_templates(loader, "agent",  load_section(loader, templates, 'agents'),  world.agent_templates,  Agent)
+
+    world.errors.extend(loader.errors)
+    return loader.errors
+
+def report_errors(tag, errors):
+    if not len(errors): return
+    perrort(tag, rich.markup.escape(f"{len(errors)} error{'s' if len(errors) > 1 else ''}:\n" + "\n".join(errors)))
 
-def load_ontology():
-    global object_templates
-    f = open("misc/agent_modeling/ontology.json")
-    ontology = json.load(f)    
+# ----------------------------------------------------------------------------------------------------------------------------------------------------
+#      @index
+# ----------------------------------------------------------------------------------------------------------------------------------------------------
+
+# an ontology can be converted into an index file so that worlds can read concepts and templates
+# from it as they are needed, rather than loading the entire thing. the file is laid out as
+#   header:  index_magic followed by the offset of the table, padded to 16 digits
+#   records: the json data of each concept and template, one per line
+#   names:   for each section, its names encoded as utf8, sorted and joined together, followed by 
+#            little endian uint64 arrays of where each name starts in that (plus where the last ends),
+#            and the offset and length of each name's record
+#   table:   json object mapping each section to its count and the file offsets of those arrays
+index_magic = b"ontology index v2 "
+
+index_sections = ('concepts', 'reqs', 'actions', 'objects', 'agents')
+
+# returns the path of the index, or None if the ontology couldn't be read
+def build_ontology_index(path = ontology_path, index_path = None):
+    if index_path is None: index_path = path + ".idx"
+    f = open(path, encoding="utf8")
+    ontology = json.load(f)
     f.close()
 
-    load_concepts(ontology)
-    # load_requirement_templates(ontology)
-    # load_action_templates(ontology)
-    load_object_templates(ontology)
-    load_agent_templates(ontology)
+    loader = OntologyLoader(None)
+    if type(ontology) != dict:
+        loader.context = "ontology"
+        loader.error("the ontology must be an object.")
+        report_errors("ontology indexing", loader.errors)
+        return None
+    templates = load_section(loader, ontology, 'templates')
+    sections = {
+        'concepts': load_section(loader, ontology,  'concepts'),
+        'reqs':     load_section(loader, templates, 'reqs'),
+        'actions':  load_section(loader, templates, 'actions'),
+        'objects':  load_section(loader, templates, 'objects'),
+        'agents':   load_section(loader, templates, 'agents'),
+    }
+    report_errors("ontology indexing", loader.errors)
+
+    def write_array(values):
+        while out.tell() % 8: out.write(b"\0")
+        pos = out.tell()
+        out.write(np.asarray(values, dtype="<u8").tobytes())
+        return pos
+
+    table = {}
+    out = open(index_path, "wb")
+    out.write(index_magic + b"%016d\n" % 0)
+    for section in index_sections:
+        entries = sorted((name.encode("utf8"), data) for name,data in sections[section].items())
+        offsets,lengths = [],[]
+        for _,data in entries:
+            record = json.dumps(data, separators=(',',':')).encode("utf8") + b"\n"
+            offsets.append(out.tell())
+            lengths.append(len(record))
+            out.write(record)
+        starts = np.cumsum([0] + [len(name) for name,_ in entries])
+        table[section] = {"count": len(entries), "names": out.tell()}
+        out.write(b"".join(name for name,_ in entries))
+        table[section]["starts"]  = write_array(starts)
+        table[section]["offsets"] = write_array(offsets)
+        table[section]["lengths"] = write_array(lengths)
+    table_offset = out.tell()
+    out.write(json.dumps(table, separators=(',',':')).encode("utf8"))
+    out.seek(0)
+    out.write(index_magic + b"%016d\n" % table_offset)
+    out.close()
+    return index_path
+
+def read_index_array(data, offset, count):
+    out = array_module.array('Q')
+    out.frombytes(data[offset : offset + 8*count])
+    if sys.byteorder != 'little': out.byteswap()
+    return out
+
+# the sorted names of one section of an index, as a sequence of utf8 strings that can be bisected.
+# the names themselves stay in the file, only the arrays of numbers (24 bytes a name) are copied out
+class IndexNames:
+    def __init__(self, data, table):
+        self.count   = table["count"]
+        self.names   = data
+        self.base    = table["names"]
+        self.starts  = read_index_array(data, table["starts"],  self.count+1)
+        self.offsets = read_index_array(data, table["offsets"], self.count)
+        self.lengths = read_index_array(data, table["lengths"], self.count)
+
+    def __len__(self):
+        return self.count
+
+    def __getitem__(self, i):
+        return self.names[self.base + self.starts[i] : self.base + self.starts[i+1]]
+
+    def find(self, name):
+        key = name.encode("utf8")
+        i = bisect.bisect_left(self, key)
+        if i < self.count and self[i] == key: return i
+        return -1
+
+# an open index file. the file is memory mapped, so only the pages of the name tables and records
+# that are actually looked at are ever read in
+class OntologyIndex:
+    def __init__(self, path):
+        self.path = path
+        f = open(path, "rb")
+        header = f.readline()
+        if not header.startswith(index_magic):
+            f.close()
+            raise ValueError(f"'{path}' is not an ontology index.")
+        self.data = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        f.close()
+        table = json.loads(self.data[int(header[len(index_magic):]):])
+        self.sections = {section: IndexNames(self.data, table[section]) for section in index_sections}
+
+    def __contains__(self, key):
+        section,name = key
+        return self.sections[section].find(name) != -1
+
+    def count(self, section):
+        return len(self.sections[section])
+
+    def names(self, section):
+        names = self.sections[section]
+        return (names[i].decode("utf8") for i in range(len(names)))
+
+    def read(self, section, name):
+        names = self.sections[section]
+        i = names.find(name)
+        if i == -1: raise KeyError(name)
+        offset = names.offsets[i]
+        return json.loads(self.data[offset : offset + names.lengths[i]])
+
+    def close(self):
+        self.sections = {}
+        self.data.close()
+
+# opens an index made by build_ontology_index as a new world, returns None if it can't be read
+def open_ontology(index_path, cache_size = 4096):
+    try:
+        index = OntologyIndex(index_path)
+    except (OSError, ValueError) as e:
+        perrort("open_ontology", str(e))
+        return None
+    return World(index, cache_size)
+
+# loader used by lazy worlds. a referenced concept is just read from the index when it is 
+# looked up, so there is nothing to resolve afterwards, and errors go straight to the world
+class LazyLoader(OntologyLoader):
+    def __init__(self, world):
+        super().__init__(world)
+        self.errors = world.errors
+        self.reported = len(self.errors)
+
+    # prints the errors found since the last report, there is no single point at which a lazy 
+    # world is done loading to report them all at once
+    def report(self):
+        report_errors("lazy loading", self.errors[self.reported:])
+        self.reported = len(self.errors)
+
+    def reference(self, name, concept, attribute):
+        if type(name) != str:
+            self.error(f"invalid value for '{attribute}', must be a string or an array of strings.")
+            return None
+        try:
+            return self.world.concepts[name]
+        except KeyError:
+            self.error(f"the concept '{name}' was not defined, but it is referenced by '{concept.name}'.")
+            return None
+
+# a read only mapping over one section of an index. entries are built with create() and then
+# filled in by fill() the first time they are looked up, and kept in a lru cache of cache_size.
+# lookups made while an entry is being filled (eg. its parents) are queued and filled by the 
+# outermost lookup, so deep chains of references don't recurse. all of them are held until that
+# lookup finishes, so cache_size bounds the cache between lookups, not during one.
+# an entry that is evicted and looked up again is rebuilt as a new object, anything that still 
+# references the old one keeps it alive
+class LazyTable(collections.abc.Mapping):
+    def __init__(self, index, section, kind, loader, create, fill, cache_size):
+        self.index      = index
+        self.section    = section
+        self.kind       = kind
+        self.loader     = loader
+        self.create     = create
+        self.fill       = fill
+        self.cache_size = cache_size
+        self.cache      = collections.OrderedDict()
+        self.loading    = {} # entries that have been created but not filled yet
+        self.queue      = collections.deque()
+        self.filling    = 0
+
+    def __contains__(self, name):
+        return type(name) == str and (self.section, name) in self.index
+
+    def __len__(self):
+        return self.index.count(self.section)
+
+    def __iter__(self):
+        return self.index.names(self.section)
+
+    def __getitem__(self, name):
+        if name in self.loading: return self.loading[name]
+        if name in self.cache:
+            self.cache.move_to_end(name)
+            return self.cache[name]
+        data = self.index.read(self.section, name) # raises KeyError for unknown names, like a dict
+
+        entry = self.create()
+        self.loading[name] = entry
+        self.queue.append((name, entry, data))
+        if not self.filling:
+            self.fill_queue()
+            # the entry asked for was filled before its references, so it has to be moved back 
+            # to the front before anything is evicted
+            self.cache.move_to_end(name)
+            while len(self.cache) > self.cache_size:
+                self.cache.popitem(last=False)
+            self.loader.report()
+        return entry
+
+    def fill_queue(self):
+        context = self.loader.context
+        self.filling = 1
+        try:
+            while len(self.queue):
+                name,entry,data = self.queue.popleft()
+                self.loader.context = f"{self.kind} '{name}'"
+                self.fill(self.loader, entry, name, data)
+                del self.loading[name]
+                self.cache[name] = entry
+        finally:
+            self.queue.clear()
+            self.loading.clear()
+            self.filling = 0
+            self.loader.context = context
 
 
 def agent_tick(agent:Agent):
@@ -624,10 +1147,12 @@ def agent_tick(agent:Agent):
 
     def perform_queue():
         if len(agent.action_queue):
-            curr:tuple[Action,int] = agent.action_queue[0]
+            curr:list = agent.action_queue[0]
             if not curr[1]:
                 agent.action_queue.pop(0)
-                print(f"Agent {agent} moves onto {agent.action_queue[0][0]}")
+                if agent.need_state is not None: agent.need_state.cost(agent, curr[0].costs)
+                if len(agent.action_queue):
+                    print(f"Agent {agent} moves onto {agent.action_queue[0][0]}")
             else: curr[1] -= 1
             if len(agent.action_queue): return 1
         return 0
@@ -635,7 +1160,7 @@ def agent_tick(agent:Agent):
     if perform_queue(): return
 
     adlist = []
-    for object in objects:
+    for object in (agent.world or default_world).objects:
         for advert in object.adverts:
             adlist.append((advert,object))
 
@@ -644,18 +1169,272 @@ def agent_tick(agent:Agent):
         v = score_advert(advert, object)
         if v > max: max,i = v,j
     for action in adlist[i][0].actions:
-        agent.action_queue.insert(0, (action, action.time))
+        agent.action_queue.insert(0, [action, action.time])
     
     perform_queue()
 
 
-load_ontology()
+# ----------------------------------------------------------------------------------------------------------------------------------------------------
+#      @graph
+# ----------------------------------------------------------------------------------------------------------------------------------------------------
+
+# relations that make up the ontology's tree, pointing from a concept up to its parent
+graph_relations = ('subclass of', 'instance of', 'part of')
+
+def as_list(value):
+    if value is None: return []
+    if type(value) == list: return value
+    return [value]
+
+# a concept with no parents besides itself, like 'entity'
+def is_root_concept(con):
+    for relation in graph_relations:
+        if relation not in con.predicates: continue
+        for parent in as_list(con.predicates[relation]):
+            if parent.name != con.name: return 0
+    return 1
+
+# maps each concept to the concepts that point at it, so that the graph can be walked downwards
+def concept_children(world = None):
+    if world is None: world = default_world
+    children = collections.defaultdict(list)
+    for con in world.concepts.values():
+        for relation in graph_relations:
+            if relation not in con.predicates: continue
+            for parent in as_list(con.predicates[relation]):
+                if parent.name != con.name: children[parent.name].append((con.name, relation))
+    return children
+
+graph_header = """<!DOCTYPE html>
+<html>
+<head>
+<meta charset="utf-8">
+<script src="https://unpkg.com/vis-network/standalone/umd/vis-network.min.js"></script>
+<style> body { margin: 0; } #graph { width: 100vw; height: 100vh; } </style>
+</head>
+<body>
+<div id="graph"></div>
+<script>
+var nodes = [], edges = [];
+function N(id, label, group, title) { nodes.push({id: id, label: label, group: group, title: title}); }
+function E(from, to, label) { edges.push({from: from, to: to, label: label, arrows: "to"}); }
+"""
+
+graph_footer = """var data = { nodes: new vis.DataSet(nodes), edges: new vis.DataSet(edges) };
+var options = {
+    layout: { improvedLayout: nodes.length < 1000 },
+    physics: { solver: "forceAtlas2Based", stabilization: { iterations: 200 } },
+    edges: { font: { size: 8 }, smooth: false },
+};
+var network = new vis.Network(document.getElementById("graph"), data, options);
+network.once("stabilizationIterationsDone", function() { network.setOptions({ physics: false }); });
+</script>
+</body>
+</html>
+"""
+
+# a string as a javascript literal that is safe to put inside a <script> tag
+def js(str):
+    return json.dumps(str).replace("</", "<\\/")
+
+# writes the loaded concepts, and optionally the 'has' relations of templates, to an html file
+# that renders them with vis-network. nodes and edges are written out as the graph is walked 
+# rather than collected first, though the map of each concept's children (concept_children) and 
+# the sets of visited and written names are still held in memory for the walk.
+#   root:          only export concepts below this one, otherwise everything is exported
+#   collapse:      concepts whose children are folded into a single summary node
+#   max_depth:     children of concepts this deep below the roots are folded
+#   max_instances: at most this many 'instance of' children are kept per concept, sampled evenly,
+#                  the rest are folded
+#   world:         the world to export, otherwise the default one
+# returns the number of nodes written
+def export_graph(path, root = None, collapse = (), max_depth = None, max_instances = None, templates = True, world = None):
+    if world is None: world = default_world
+    concepts = world.concepts
+    if root is not None and root not in concepts:
+        perrort("export_graph", f"The root '{root}' is not a concept.")
+        return 0
+
+    children = concept_children(world)
+    visited = set() # concepts that have been written or folded
+    nodes = set()   # concepts that have been written
+    written = 0
+
+    f = open(path, "w", encoding="utf8")
+    f.write(graph_header)
+
+    def node(id, label, group, title = ""):
+        nonlocal written
+        f.write(f"N({js(id)},{js(label)},{js(group)},{js(title)});\n")
+        written += 1
+
+    def edge(a, b, label):
+        f.write(f"E({js(a)},{js(b)},{js(label)});\n")
+
+    # counts and marks everything under a folded concept, so that it doesn't show up elsewhere
+    def fold(name):
+        count = 0
+        stack = [name]
+        while len(stack):
+            n = stack.pop()
+            if n in visited: continue
+            visited.add(n)
+            count += 1
+            stack.extend(c for c,_ in children[n])
+        return count
+
+    def folded(parent, count, what):
+        if not count: return
+        id = f"{parent}/{what}"
+        node(id, f"+{count} {what}", "folded")
+        edge(id, parent, what)
+
+    def concept_node(name):
+        visited.add(name)
+        nodes.add(name)
+        node(name, name, "concept", concepts[name].desc)
+
+    def walk(start):
+        concept_node(start)
+        queue = collections.deque([(start, 0)])
+        while len(queue):
+            name,depth = queue.popleft()
+            kids = children[name]
+            if name in collapse or (max_depth is not None and depth >= max_depth):
+                folded(name, sum(fold(c) for c,_ in kids), "concepts")
+                continue
+            if max_instances is not None:
+                instances = [k for k in kids if k[1] == 'instance of']
+                if len(instances) > max_instances:
+                    step = -(-len(instances)//max_instances) if max_instances else len(instances)
+                    keep = set(instances[::step][:max_instances])
+                    kids = [k for k in kids if k[1] != 'instance of' or k in keep]
+                    folded(name, sum(fold(c) for c,r in instances if (c,r) not in keep), "instances")
+            for child,relation in kids:
+                if child not in visited:
+                    concept_node(child)
+                    queue.append((child, depth+1))
+                # the child may have been folded under another parent, in which case it has no node
+                if child in nodes: edge(child, name, relation)
+
+    if root is not None:
+        walk(root)
+    else:
+        # walk from the concepts that have no parents first so that depth means something, then 
+        # pick up anything only reachable through a cycle
+        for name in concepts:
+            if name not in visited and is_root_concept(concepts[name]): walk(name)
+        for name in concepts:
+            if name not in visited: walk(name)
+
+    if templates:
+        for kind,table in (("object", world.object_templates), ("agent", world.agent_templates)):
+            for name,template in table.items():
+                if name not in nodes: continue
+                has = template.predicates.get('has')
+                if type(has) != dict: continue
+                for slot,obj in has.items():
+                    if not isinstance(obj, Object): continue
+                    target = obj.predicates['instance of'].name if 'instance of' in obj.predicates else obj.name
+                    if target in nodes: edge(name, target, f"has ({slot})")
+
+    f.write(graph_footer)
+    f.close()
+    return written
+
+
+# ----------------------------------------------------------------------------------------------------------------------------------------------------
+#      @ui
+# ----------------------------------------------------------------------------------------------------------------------------------------------------
+
+# an immutable view of the simulation at some point in time. this is all the ui ever gets to 
+# look at, so it never has to touch agents while the simulation is changing them
+Snapshot = collections.namedtuple("Snapshot", ["time", "needs", "progress", "actions"])
+
+# double buffered simulation state. the simulation fills the back buffer and then flips it to 
+# the front, the renderer copies out of the front buffer whenever it wants to draw. the lock is 
+# only held for the flip and the copy, so neither side ever waits on the other doing real work
+class StateBuffer:
+    def __init__(self):
+        self.needs    = [np.zeros((0, needs.count.value)), np.zeros((0, needs.count.value))]
+        self.progress = [np.zeros(0), np.zeros(0)]
+        self.actions  = [(), ()]
+        self.time     = [0, 0]
+        self.front    = 0
+        self.lock     = threading.Lock()
+
+    def publish(self, agents, time):
+        back = 1 - self.front
+        if len(self.needs[back]) != len(agents):
+            self.needs[back]    = np.zeros((len(agents), needs.count.value))
+            self.progress[back] = np.zeros(len(agents))
+        actions = []
+        for i,agent in enumerate(agents):
+            self.needs[back][i] = agent.needs
+            if len(agent.action_queue):
+                action,remaining = agent.action_queue[0]
+                self.progress[back][i] = 1 - remaining/action.time if action.time else 1
+                actions.append(action.name)
+            else:
+                self.progress[back][i] = 0
+                actions.append("")
+        self.actions[back] = tuple(actions)
+        self.time[back] = time
+        with self.lock:
+            self.front = back
+
+    def read(self):
+        with self.lock:
+            front = self.front
+            n = self.needs[front].copy()
+            p = self.progress[front].copy()
+            t = self.time[front]
+            a = self.actions[front]
+        n.flags.writeable = False
+        p.flags.writeable = False
+        return Snapshot(t, n, p, a)
+
+state = StateBuffer()
+
+def toggle_pause():
+    if running.is_set(): running.clear()
+    else: running.set()
+
+# draws a snapshot into the layout. only the first agent is shown for now
+def render(snapshot:Snapshot):
+    if len(snapshot.needs):
+        for k,task in zip(needs, need_tasks):
+            if k == needs.count: continue
+            progress.update(task, completed=snapshot.needs[0][k.value])
+        progress.update(state_task, total=1, completed=snapshot.progress[0], description=snapshot.actions[0])
+    layout["time"].update(f"{format_time(snapshot.time)}{'' if running.is_set() else ' (paused)'}")
+
+# prints the threshold crossings of a step above the ui
+def report_need_events(need_state, events):
+    for row,need,before,after in zip(*events):
+        agent = rich.markup.escape(str(need_state.agents[row]))
+        if after < before: print(f"{agent}'s {needs(need).name} fell below {need_state.thresholds[after]:g}")
+        else:              print(f"{agent}'s {needs(need).name} rose above {need_state.thresholds[after-1]:g}")
+
+# runs the simulation as fast as it can, independent of how often the ui is drawn
+def simulate():
+    global total_time
+    while 1:
+        running.wait()
+        for agent in agents:
+            agent_tick(agent)
+        report_need_events(need_state, need_state.step(1))
+        total_time += 1
+        state.publish(agents, total_time)
+
+
+report_errors("ontology loading", load_ontology())
 
 agent:Agent = load_agent_from_template("human") 
 agent.name = "Noe"
 agent.age = 20*one_year
 agent.pos = array([3,2])
-agents.append(agent)
+add_agent(agent)
 
 object:Object = load_object_from_template("apple") # type:ignore
 object.name = "apple"
@@ -664,8 +1443,16 @@ objects.append(object)
 
 print(agent.predicates)
 
-while 1:
-    for agent in agents:
-        agent_tick(agent)
+keyboard.add_hotkey("space", toggle_pause)
+state.publish(agents, total_time)
+
+sim_thread = threading.Thread(target=simulate, daemon=True)
+sim_thread.start()
+
+with live:
+    while 1:
+        render(state.read())
+        time.sleep(1/ui_refresh_rate)
+
 
 
@@ -0,0 +1,236 @@
+import os
+import re
+import json
+import bisect
+import hashlib
+import argparse
+from gen_notes import repos_path, todos_files, find_files, find_todos
+
+notes_path = "../notes/";
+index_path = "notes_index.json";
+
+#index layout, kept in index_path between runs:
+#  docs:  arr of (kind str, source str, owner str, date str, arr of tag strs, text str), None once removed until the index is saved
+#  words: word -> arr of doc ids
+#  tags:  tag -> arr of doc ids. the owner (user for notes, project for todos) is also a tag, and tags are kept without a leading #
+#  dates: sorted arr of (date str, doc id) for every doc that has a date
+#  files: path -> state needed to update the docs from that file without reparsing it
+#         notes files: {"offset": byte offset of the entry to resume parsing at, "end": offset of the end of its first line,
+#                       "date": date in effect before it, "hash": sha1 of the file up to end, "mtime": float, "size": file size,
+#                       "tail": ids of the docs from offset on, "docs": arr of ids}
+#         todo files:  {"mtime": float, "docs": arr of ids}
+#dates are kept as yy/mm/dd so they sort as strings, "" if a doc has none.
+#a notes file is only looked at again when its mtime or size changes. then, if the hash of everything up
+#to the resume entry's first line still matches, only that entry and what comes after it are parsed. 
+#any other edit changes the hash, and the whole file is parsed again
+
+date_line = re.compile(r"^\s*\[(\d\d/\d\d/\d\d)\]\s*(.*)$");
+bullet    = re.compile(r"^\s*\*\s?(.*)$");
+
+def words_of(text):
+    return set(re.findall(r"[a-z0-9_]+", text.lower()));
+
+def note_tags(text):
+    return re.findall(r"(?<!\S)#(\w+)", text);
+
+def normalize_date(date):
+    date = date.strip();
+    return date if re.fullmatch(r"\d\d/\d\d/\d\d", date) else "";
+
+def empty_index():
+    return {"docs": [], "words": {}, "tags": {}, "dates": [], "files": {}};
+
+def load_index(path):
+    if not os.path.exists(path): return empty_index();
+    with open(path, mode="r", encoding="utf8") as file:
+        index = json.load(file);
+    #indexes from older versions of this script are rebuilt
+    if any(_ not in index for _ in empty_index()): return empty_index();
+    return index;
+
+#renumbers the docs so removed ones don't take up ids
+def compact_index(index):
+    ids = {};
+    for id, doc in enumerate(index["docs"]):
+        if doc is not None: ids[id] = len(ids);
+    if len(ids) == len(index["docs"]): return;
+    index["docs"]  = [_ for _ in index["docs"] if _ is not None];
+    index["words"] = {word: [ids[_] for _ in arr] for word,arr in index["words"].items() if len(arr)};
+    index["tags"]  = {tag:  [ids[_] for _ in arr] for tag,arr  in index["tags"].items()  if len(arr)};
+    index["dates"] = [[date, ids[id]] for date,id in index["dates"]];
+    for state in index["files"].values():
+        state["docs"] = [ids[_] for _ in state["docs"]];
+        if "tail" in state: state["tail"] = [ids[_] for _ in state["tail"]];
+
+def save_index(index, path):
+    compact_index(index);
+    with open(path, mode="w", encoding="utf8") as file:
+        json.dump(index, file, separators=(',',':'));
+
+def add_doc(index, kind, source, owner, date, tags, text):
+    id = len(index["docs"]);
+    tags = list(dict.fromkeys([owner] + tags));
+    index["docs"].append((kind, source, owner, date, tags, text));
+    for word in words_of(text): index["words"].setdefault(word, []).append(id);
+    for tag in tags:            index["tags"].setdefault(tag, []).append(id);
+    if date: bisect.insort(index["dates"], [date, id]);
+    return id;
+
+def remove_doc(index, id):
+    doc = index["docs"][id];
+    if doc is None: return;
+    for word in words_of(doc[5]): index["words"][word].remove(id);
+    for tag in doc[4]:            index["tags"][tag].remove(id);
+    if doc[3]: del index["dates"][bisect.bisect_left(index["dates"], [doc[3], id])];
+    index["docs"][id] = None;
+
+#parses notes.txt entries starting at offset, which must be the start of an entry (or of the file), 
+#where date is the date in effect there.
+#an entry starts at a [yy/mm/dd] line with text after it or at a * bullet, and runs until the next one.
+#a line of text under a new date with no bullet before it also starts one.
+#returns arr of (offset, date, text, date before the entry, offset of the end of its first line)
+def parse_notes(contents, offset, date):
+    entries = []; #(offset, date, arr of lines, date before, first line end)
+    pos = offset;
+    for line in contents.splitlines(keepends=True):
+        text = line.decode("utf8", errors="replace").rstrip();
+        before = date;
+        m = date_line.match(text);
+        if m:
+            date = m.group(1);
+            if m.group(2): entries.append((pos, date, [m.group(2)], before, pos+len(line)));
+        else:
+            m = bullet.match(text);
+            if m:
+                entries.append((pos, date, [m.group(1)], before, pos+len(line)));
+            elif text.strip():
+                if len(entries) and entries[-1][1] == date: entries[-1][2].append(text.strip());
+                else: entries.append((pos, date, [text.strip()], before, pos+len(line)));
+        pos += len(line);
+    return [(o, d, " ".join(lines), b, e) for o,d,lines,b,e in entries];
+
+def update_notes_file(index, path, owner):
+    stat  = os.stat(path);
+    state = index["files"].get(path);
+    if (state is not None) and (state["mtime"] == stat.st_mtime) and (state["size"] == stat.st_size): return 0;
+
+    with open(path, mode="rb") as file:
+        #everything up to the end of the resume entry's first line is hashed rather than parsed, to 
+        #make sure it is unchanged
+        hash = hashlib.sha1();
+        if state is not None:
+            prefix = file.read(state["end"]);
+            hash.update(prefix);
+            if (len(prefix) < state["end"]) or (hash.hexdigest() != state["hash"]):
+                #the file was changed rather than appended to, so start over
+                for id in state["docs"]: remove_doc(index, id);
+                state = None;
+        if state is None:
+            state = {"offset": 0, "end": 0, "date": "", "hash": "", "mtime": 0, "size": 0, "tail": [], "docs": []};
+            index["files"][path] = state;
+            hash = hashlib.sha1();
+        file.seek(state["offset"]);
+        contents = file.read();
+
+    for id in state["tail"]:
+        remove_doc(index, id);
+        state["docs"].remove(id);
+    entries = parse_notes(contents, state["offset"], state["date"]);
+    ids = [];
+    for _, date, text, _, _ in entries:
+        ids.append(add_doc(index, "note", path, owner, date, note_tags(text), text));
+    state["docs"].extend(ids);
+
+    #the next update resumes at the second to last entry, since an edit to the last entry's first line
+    #can make it part of the entry before it
+    if len(entries):
+        k = max(0, len(entries)-2);
+        start, _, _, date_before, end = entries[k];
+        hash.update(contents[state["end"]-state["offset"] : end-state["offset"]]);
+        state["offset"] = start;
+        state["end"]    = end;
+        state["date"]   = date_before;
+        state["tail"]   = ids[k:];
+    else:
+        state["tail"]   = [];
+    state["hash"]  = hash.hexdigest();
+    state["mtime"] = stat.st_mtime;
+    state["size"]  = stat.st_size;
+    return len(entries);
+
+def update_todos_file(index, path):
+    mtime = os.path.getmtime(path);
+    state = index["files"].get(path);
+    if (state is not None) and (state["mtime"] == mtime): return 0;
+    if state is not None:
+        for id in state["docs"]: remove_doc(index, id);
+    state = {"mtime": mtime, "docs": []};
+    index["files"][path] = state;
+
+    todos = find_todos(path);
+    for project, group, date, difficulty, tags, desc in todos:
+        tags = [t.lstrip("#") for t in [group] + tags];
+        state["docs"].append(add_doc(index, "todo", path, project, normalize_date(date), [t for t in tags if t], desc));
+    return len(todos);
+
+#brings the index up to date with every notes/*/notes.txt and the todos in repos, only reading what changed
+def update_index(index):
+    seen = set();
+    count = 0;
+    if os.path.isdir(notes_path):
+        for user in sorted(os.listdir(notes_path)):
+            path = notes_path + user + "/notes.txt";
+            if not os.path.isfile(path): continue;
+            seen.add(path);
+            count += update_notes_file(index, path, user);
+    if os.path.isdir(repos_path):
+        for path in (_ for _ in find_files(repos_path, [".cpp"]) if _.endswith(todos_files)):
+            seen.add(path);
+            count += update_todos_file(index, path);
+
+    #drop docs from files that no longer exist
+    for path in [_ for _ in index["files"] if _ not in seen]:
+        for id in index["files"][path]["docs"]: remove_doc(index, id);
+        del index["files"][path];
+    return count;
+
+#returns the ids of docs that have every word and tag, and a date within [date_from, date_to] if given
+def search(index, words = (), tags = (), date_from = "", date_to = ""):
+    ids = None;
+    for word in words:
+        for w in words_of(word):
+            found = set(index["words"].get(w, ()));
+            ids = found if ids is None else ids & found;
+    for tag in tags:
+        found = set(index["tags"].get(tag.lstrip("#"), ()));
+        ids = found if ids is None else ids & found;
+    if date_from or date_to:
+        dates = index["dates"];
+        start = bisect.bisect_left(dates, [date_from, -1]) if date_from else 0;
+        end   = bisect.bisect_right(dates, [date_to, len(index["docs"])]) if date_to else len(dates);
+        found = set(id for _,id in dates[start:end]);
+        ids = found if ids is None else ids & found;
+    if ids is None: ids = set(id for id,doc in enumerate(index["docs"]) if doc is not None);
+    return sorted(ids, key=lambda id: (index["docs"][id][3], id));
+
+def main():
+    parser = argparse.ArgumentParser(description="search notes/*/notes.txt entries and source TODOs");
+    parser.add_argument("words", nargs="*", help="words every result must contain");
+    parser.add_argument("--tag", action="append", default=[], help="tag (or user/project) every result must have");
+    parser.add_argument("--from", dest="date_from", default="", help="earliest date, yy/mm/dd");
+    parser.add_argument("--to",   dest="date_to",   default="", help="latest date, yy/mm/dd");
+    parser.add_argument("--rebuild", action="store_true", help="reparse everything instead of updating the index");
+    args = parser.parse_args();
+    for name in ("date_from", "date_to"):
+        date = getattr(args, name);
+        if date and not normalize_date(date): parser.error(f"bad date '{date}', expected yy/mm/dd");
+        setattr(args, name, normalize_date(date));
+
+    index = empty_index() if args.rebuild else load_index(index_path);
+    if update_index(index) or args.rebuild: save_index(index, index_path);
+
+    for id in search(index, args.words, args.tag, args.date_from, args.date_to):
+        kind, source, owner, date, tags, text = index["docs"][id];
+        print(f"[{date or '?'}] {kind} {owner}: {text}");
+
+if __name__ == "__main__": main();